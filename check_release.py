@@ -3,18 +3,111 @@
 Проверка целостности releases
 Проверяет что размеры и хеши в version.json совпадают с реальными файлами
 """
-import json
 import hashlib
+import mmap
+import os
+import ssl
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import orjson
 
-def calculate_sha256(filepath: Path) -> str:
-    """Вычислить SHA256"""
-    sha256_hash = hashlib.sha256()
+assert "sha256" in hashlib.algorithms_guaranteed
+
+
+CHUNK_SIZE = 1 << 20  # 1 MiB
+MMAP_THRESHOLD = 16 << 20  # 16 MiB
+CHECKSUM_CACHE = Path("releases") / ".checksum_cache.json"
+
+# path -> {"size", "mtime_ns", "sha256"}
+_checksum_cache = None
+_checksum_lock = threading.Lock()
+
+
+# Пустой контекст-прототип: copy() дешевле создания нового EVP-контекста
+_PROTO = hashlib.new("sha256", usedforsecurity=False)
+
+
+def _new_sha256():
+    """SHA256 через OpenSSL (SHA-NI / ARMv8 Crypto, если доступны)"""
+    return _PROTO.copy()
+
+
+def _load_checksum_cache() -> dict:
+    """Загрузить кеш хешей (один раз за запуск)"""
+    global _checksum_cache
+    if _checksum_cache is None:
+        try:
+            with open(CHECKSUM_CACHE, 'rb') as f:
+                _checksum_cache = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            _checksum_cache = {}
+    return _checksum_cache
+
+
+def _write_json_atomic(path: Path, data: dict):
+    """Записать JSON через временный файл + os.replace (без частичной записи)"""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    os.replace(tmp, path)
+
+
+def _save_checksum_cache():
+    """Атомарно записать кеш хешей (кеш - оптимизация, ошибка записи не фатальна)"""
+    with _checksum_lock:
+        if _checksum_cache is None:
+            return
+        try:
+            _write_json_atomic(CHECKSUM_CACHE, _checksum_cache)
+        except OSError as e:
+            print(f"⚠️  Не удалось записать кеш хешей {CHECKSUM_CACHE}: {e}")
+
+
+def calculate_sha256(filepath: Path, use_cache: bool = True) -> str:
+    """Вычислить SHA256 (с кешем по size + mtime_ns)
+
+    use_cache=False - всегда перехешировать; результат все равно
+    обновляет кеш в памяти. На диск кеш пишет _save_checksum_cache().
+    """
+    key = str(filepath)
+    st = os.stat(filepath)
+
+    if use_cache:
+        with _checksum_lock:
+            entry = _load_checksum_cache().get(key)
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            return entry["sha256"]
+
+    # Хеширование вне блокировки, чтобы потоки работали параллельно
+    sha256 = _hash_file(filepath)
+
+    with _checksum_lock:
+        _load_checksum_cache()[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256}
+    return sha256
+
+
+def _hash_file(filepath: Path) -> str:
+    """Вычислить SHA256 содержимого файла"""
     with open(filepath, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+        # Большие файлы хешируем через mmap одним вызовом
+        if os.fstat(f.fileno()).st_size > MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                sha256_hash = _new_sha256()
+                sha256_hash.update(mm)
+                return sha256_hash.hexdigest()
+
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, _new_sha256).hexdigest()
+
+        # Python < 3.11: читаем в переиспользуемый буфер
+        sha256_hash = _new_sha256()
+        buf = bytearray(CHUNK_SIZE)
+        mv = memoryview(buf)
+        while n := f.readinto(mv):
+            sha256_hash.update(mv[:n])
+        return sha256_hash.hexdigest()
 
 
 def format_size(size: int) -> str:
@@ -26,8 +119,43 @@ def format_size(size: int) -> str:
     return f"{size:.1f} TB"
 
 
-def check_releases():
-    """Проверить все releases"""
+def _verify_one(version_dir: Path, use_cache: bool = True) -> dict:
+    """Проверить одну версию (выполняется в пуле потоков, ничего не печатает)"""
+    version_json = version_dir / "version.json"
+    terminal_exe = version_dir / "ManekiTerminal.exe"
+    result = {"version": version_dir.name, "error": None}
+
+    # Проверить наличие файлов
+    if not terminal_exe.exists():
+        result["error"] = f"❌ Файл не найден: {terminal_exe}"
+        return result
+
+    # Прочитать version.json
+    try:
+        with open(version_json, 'rb') as f:
+            data = orjson.loads(f.read())
+    except Exception as e:
+        result["error"] = f"❌ Ошибка чтения version.json: {e}"
+        return result
+
+    actual_size = terminal_exe.stat().st_size
+    actual_hash = calculate_sha256(terminal_exe, use_cache)
+
+    result.update({
+        "data": data,
+        "actual_size": actual_size,
+        "size_ok": actual_size == data.get('size', 0),
+        "actual_hash": actual_hash,
+        "hash_ok": actual_hash == data.get('sha256', ''),
+    })
+    return result
+
+
+def check_releases(jobs: int = None, use_cache: bool = True):
+    """Проверить все releases
+
+    jobs - число потоков хеширования, use_cache=False - перехешировать все файлы.
+    """
     releases_dir = Path("releases")
 
     if not releases_dir.exists():
@@ -37,13 +165,27 @@ def check_releases():
 
     print("=" * 80)
     print("🔍 Проверка целостности releases")
+    print(f"   {ssl.OPENSSL_VERSION}")
     print("=" * 80)
 
-    # Найти все версии
-    versions = []
-    for version_dir in releases_dir.iterdir():
-        if version_dir.is_dir() and (version_dir / "version.json").exists():
-            versions.append(version_dir)
+    # Найти все версии за один проход scandir (ключ сортировки считаем сразу)
+    # Симлинки на папки версий учитываются, как и на сервере
+    entries = []
+    with os.scandir(releases_dir) as it:
+        for entry in it:
+            if not entry.is_dir():
+                continue
+            if not os.path.exists(os.path.join(entry.path, "version.json")):
+                continue
+            try:
+                key = tuple(int(x) for x in entry.name.split('.'))
+            except ValueError:
+                print(f"⚠️  Пропущена папка {entry.name}/: имя не является версией")
+                continue
+            entries.append((key, Path(entry.path)))
+
+    entries.sort()
+    versions = [version_dir for _, version_dir in entries]
 
     if not versions:
         print("\n⚠️  Не найдено ни одного релиза")
@@ -55,39 +197,34 @@ def check_releases():
         print("└── latest.json")
         return False
 
-    # Сортировать версии
-    versions.sort(key=lambda p: [int(x) for x in p.name.split('.')])
-
     all_ok = True
 
-    for version_dir in versions:
-        version = version_dir.name
-        version_json = version_dir / "version.json"
-        terminal_exe = version_dir / "ManekiTerminal.exe"
+    # Хешировать версии параллельно (OpenSSL отпускает GIL), печатать по порядку
+    max_workers = jobs or min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda d: _verify_one(d, use_cache), versions))
+
+    # Кеш пишется один раз после всех хешей
+    _save_checksum_cache()
+
+    for result in results:
+        version = result["version"]
 
         print(f"\n📦 Проверка версии {version}")
         print("-" * 80)
 
-        # Проверить наличие файлов
-        if not terminal_exe.exists():
-            print(f"❌ Файл не найден: {terminal_exe}")
+        if result["error"]:
+            print(result["error"])
             all_ok = False
             continue
 
-        # Прочитать version.json
-        try:
-            with open(version_json, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except Exception as e:
-            print(f"❌ Ошибка чтения version.json: {e}")
-            all_ok = False
-            continue
+        data = result["data"]
 
         # Проверить размер
-        actual_size = terminal_exe.stat().st_size
+        actual_size = result["actual_size"]
         expected_size = data.get('size', 0)
 
-        size_match = actual_size == expected_size
+        size_match = result["size_ok"]
         size_icon = "✓" if size_match else "✗"
 
         print(f"\n📏 Размер файла:")
@@ -102,12 +239,11 @@ def check_releases():
 
         # Проверить хеш
         print(f"\n🔐 SHA256 хеш:")
-        print(f"  Вычисление...")
 
-        actual_hash = calculate_sha256(terminal_exe)
+        actual_hash = result["actual_hash"]
         expected_hash = data.get('sha256', '')
 
-        hash_match = actual_hash == expected_hash
+        hash_match = result["hash_ok"]
         hash_icon = "✓" if hash_match else "✗"
 
         print(f"  {hash_icon} Ожидается: {expected_hash}")
@@ -143,8 +279,8 @@ def check_releases():
     latest_json = releases_dir / "latest.json"
     if latest_json.exists():
         try:
-            with open(latest_json, 'r', encoding='utf-8') as f:
-                latest_data = json.load(f)
+            with open(latest_json, 'rb') as f:
+                latest_data = orjson.loads(f.read())
 
             latest_version = latest_data.get('version')
             print(f"✓ Последняя версия: {latest_version}")
@@ -195,12 +331,13 @@ def fix_version_json(version: str):
     print(f"🔧 Исправление version.json для версии {version}...")
 
     # Прочитать текущий
-    with open(version_json, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    with open(version_json, 'rb') as f:
+        data = orjson.loads(f.read())
 
-    # Вычислить правильные значения
+    # Вычислить правильные значения (без кеша)
     actual_size = terminal_exe.stat().st_size
-    actual_hash = calculate_sha256(terminal_exe)
+    actual_hash = calculate_sha256(terminal_exe, use_cache=False)
+    _save_checksum_cache()
 
     print(f"  Старый размер: {data.get('size')}")
     print(f"  Новый размер:  {actual_size}")
@@ -212,21 +349,21 @@ def fix_version_json(version: str):
     data['sha256'] = actual_hash
 
     # Записать
-    with open(version_json, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    _write_json_atomic(version_json, data)
 
     print(f"✓ version.json обновлен!")
 
     # Обновить latest.json если это последняя версия
     latest_json = releases_dir / "latest.json"
     if latest_json.exists():
-        with open(latest_json, 'r', encoding='utf-8') as f:
-            latest_data = json.load(f)
+        with open(latest_json, 'rb') as f:
+            latest_data = orjson.loads(f.read())
 
         if latest_data.get('version') == version:
             print(f"  Обновление latest.json...")
-            with open(latest_json, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            # Обновить только размер и хеш, сохранив остальные поля latest.json
+            merged = {**latest_data, "size": actual_size, "sha256": actual_hash}
+            _write_json_atomic(latest_json, merged)
             print(f"✓ latest.json обновлен!")
 
     return True
@@ -235,20 +372,35 @@ def fix_version_json(version: str):
 def main():
     import sys
 
-    if len(sys.argv) > 1:
-        command = sys.argv[1]
-
-        if command == "fix" and len(sys.argv) > 2:
-            version = sys.argv[2]
-            success = fix_version_json(version)
-            sys.exit(0 if success else 1)
+    args = sys.argv[1:]
+
+    def usage():
+        print("Usage:")
+        print("  python check_releases.py              # Проверить все релизы")
+        print("  python check_releases.py --jobs 4     # Проверить в 4 потока")
+        print("  python check_releases.py --no-cache   # Перехешировать все файлы")
+        print("  python check_releases.py fix 0.0.2    # Исправить version.json")
+        sys.exit(1)
+
+    if args and args[0] == "fix":
+        if len(args) != 2:
+            usage()
+        success = fix_version_json(args[1])
+        sys.exit(0 if success else 1)
+
+    jobs = None
+    use_cache = True
+
+    while args:
+        option = args.pop(0)
+        if option == "--jobs" and args and args[0].isdigit():
+            jobs = int(args.pop(0))
+        elif option == "--no-cache":
+            use_cache = False
         else:
-            print("Usage:")
-            print("  python check_releases.py           # Проверить все релизы")
-            print("  python check_releases.py fix 0.0.2 # Исправить version.json")
-            sys.exit(1)
+            usage()
 
-    success = check_releases()
+    success = check_releases(jobs, use_cache)
     sys.exit(0 if success else 1)
 
 
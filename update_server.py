@@ -1,9 +1,21 @@
 """
 Update Server для ManekiTerminal
 """
-from flask import Flask, jsonify, send_file, request
+from flask import Flask, Response, abort, send_file, request
 from pathlib import Path
-import json
+import functools
+import os
+import threading
+
+import orjson
+from werkzeug.exceptions import HTTPException
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog опционален: без него реестр обновляется только по таймеру
+    FileSystemEventHandler = object
+    Observer = None
 
 app = Flask(__name__)
 
@@ -11,241 +23,491 @@ app = Flask(__name__)
 RELEASES_DIR = Path("releases")
 RELEASES_DIR.mkdir(exist_ok=True)
 
+# nginx: internal location, отдающий RELEASES_DIR через sendfile
+ACCEL_REDIRECT_PREFIX = "/protected/"
+
+# Файлы конкретной версии неизменны после публикации
+RELEASE_MAX_AGE = 86400
+
+# Задержка перезагрузки реестра после событий watchdog (склеивает серии событий)
+RELOAD_DEBOUNCE = 0.5
+
+# Интервал страховочного пересканирования при активном watchdog
+# (inotify не видит изменений на NFS / SMB)
+WATCHED_REFRESH_INTERVAL = 300.0
+
+
+SETUP_PREFIX = "ManekiTerminal-Setup-"
+SETUP_SUFFIX = ".exe"
+
+
+def _is_setup_name(name: str) -> bool:
+    """ManekiTerminal-Setup-X.X.X.exe"""
+    return name.startswith(SETUP_PREFIX) and name.endswith(SETUP_SUFFIX)
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_version(v: str) -> tuple:
+    """Разобрать строку версии в кортеж чисел"""
+    return tuple(int(x) for x in v.split('.'))
+
+
+def _compare_versions(v1: str, v2: str) -> int:
+    """Сравнить версии. Возвращает: 1 если v1 > v2, -1 если v1 < v2, 0 если равны"""
+    a, b = _parse_version(v1), _parse_version(v2)
+
+    # Дополнить нулями до одинаковой длины: 1.0 == 1.0.0
+    n = max(len(a), len(b))
+    a += (0,) * (n - len(a))
+    b += (0,) * (n - len(b))
+
+    return (a > b) - (a < b)
+
+
+class _ManifestWatcher(FileSystemEventHandler):
+    """Перезагрузка реестра при изменении latest.json / */version.json / Setup"""
+
+    WATCHED_NAMES = ("latest.json", "version.json")
+
+    @classmethod
+    def is_watched(cls, name: str, include_setup: bool = True) -> bool:
+        return name in cls.WATCHED_NAMES or (include_setup and _is_setup_name(name))
+
+    def __init__(self, manager: "ReleaseManager"):
+        super().__init__()
+        self.manager = manager
+
+    # Только события, меняющие содержимое: opened / closed_no_write
+    # вызывает сам _reload(), реакция на них зациклила бы перезагрузку
+    def on_created(self, event):
+        self._handle(event)
+
+    def on_modified(self, event):
+        # Setup файл при загрузке шлет modified на каждую запись:
+        # для него достаточно created / moved / deleted / closed
+        self._handle(event, include_setup=False)
+
+    def on_moved(self, event):
+        self._handle(event)
+
+    def on_deleted(self, event):
+        self._handle(event)
+
+    def on_closed(self, event):
+        # closed = закрытие после записи
+        self._handle(event)
+
+    def _handle(self, event, include_setup: bool = True):
+        if event.is_directory:
+            return
+
+        paths = (event.src_path, getattr(event, "dest_path", ""))
+        if any(self.is_watched(Path(p).name, include_setup) for p in paths if p):
+            self.manager.request_reload()
+
 
 class ReleaseManager:
     """Управление релизами"""
 
-    def __init__(self, releases_dir: Path):
+    def __init__(self, releases_dir: Path, refresh_interval: float = 30.0):
         self.releases_dir = releases_dir
+        self.refresh_interval = refresh_interval
+
+        # Реестр релизов в памяти: запросы не читают диск
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        self._versions: dict[str, dict] = {}
+        self._latest: dict = None
+        self._setup_sizes: dict[str, int] = {}
+        self._latest_setup: str = None
+
+        # Готовые тела ответов: сериализуются один раз на пересканирование
+        self._versions_json_bytes: bytes = b""
+        self._latest_json_bytes: bytes = None
+
+        self._observer = None
+        self._reload_timer = None
+
+        self._reload()
+        if self._start_watcher():
+            self.refresh_interval = max(self.refresh_interval, WATCHED_REFRESH_INTERVAL)
+        self._schedule_refresh()
+
+    def _reload(self):
+        """Пересканировать releases/ и пересобрать реестр"""
+        # Сканирование и замена под одной блокировкой: таймер и watchdog
+        # не должны перезаписать свежий реестр результатом более старого скана
+        with self._reload_lock:
+            registry = self._scan()
+            with self._lock:
+                self._versions = registry["versions"]
+                self._latest = registry["latest"]
+                self._versions_json_bytes = registry["versions_json_bytes"]
+                self._latest_json_bytes = registry["latest_json_bytes"]
+                self._setup_sizes = registry["setup_sizes"]
+                self._latest_setup = registry["latest_setup"]
+
+    def _scan(self) -> dict:
+        """Прочитать releases/ и собрать новый реестр (без изменения self)"""
+        versions = {}
+        sort_keys = {}
+        setup_sizes = {}
+
+        # Найти все папки с версиями и Setup файлы за один проход scandir
+        with os.scandir(self.releases_dir) as it:
+            for entry in it:
+                # is_dir() берет тип из записи каталога, без отдельного stat
+                if not entry.is_dir():
+                    if _is_setup_name(entry.name):
+                        # Размер сохраняется в реестре: /api/setup/latest без stat
+                        try:
+                            setup_sizes[entry.name] = entry.stat().st_size
+                        except FileNotFoundError:
+                            pass
+                    continue
+                version_json = os.path.join(entry.path, "version.json")
+                # Битый релиз пропускается, остальные продолжают работать
+                try:
+                    with open(version_json, 'rb') as f:
+                        data = orjson.loads(f.read())
+                    sort_keys[entry.name] = _parse_version(data["version"])
+                except FileNotFoundError:
+                    continue
+                except Exception as e:
+                    app.logger.warning("Skipping %s: %r", version_json, e)
+                    continue
+                versions[entry.name] = data
 
-    def get_latest_release(self) -> dict:
-        """Получить последний релиз Terminal"""
+        # Сортировать по версии (новые сначала)
+        sorted_versions = sorted(versions, key=sort_keys.__getitem__, reverse=True)
+
+        latest = None
         manifest_file = self.releases_dir / "latest.json"
+        if manifest_file.exists():
+            try:
+                with open(manifest_file, 'rb') as f:
+                    latest = orjson.loads(f.read())
+                _parse_version(latest["version"])
+            except Exception as e:
+                latest = None
+                app.logger.warning("Skipping %s: %r", manifest_file, e)
+
+        # Последний Setup по версии из имени файла
+        latest_setup = None
+        best_key = (-1,)
+        for name in setup_sizes:
+            # ManekiTerminal-Setup-0.0.2.exe -> (0, 0, 2)
+            try:
+                key = tuple(int(x) for x in name[len(SETUP_PREFIX):-len(SETUP_SUFFIX)].split('.'))
+            except ValueError:
+                continue
+            if key > best_key:
+                best_key, latest_setup = key, name
+
+        versions_list = [versions[v] for v in sorted_versions]
+        versions_json_bytes = orjson.dumps({
+            "success": True,
+            "data": {
+                "versions": versions_list,
+                "count": len(versions_list)
+            }
+        })
+        latest_json_bytes = None
+        if latest:
+            latest_json_bytes = orjson.dumps({
+                "success": True,
+                "data": latest
+            })
+
+        return {
+            "versions": versions,
+            "latest": latest,
+            "versions_json_bytes": versions_json_bytes,
+            "latest_json_bytes": latest_json_bytes,
+            "setup_sizes": setup_sizes,
+            "latest_setup": latest_setup,
+        }
 
-        if not manifest_file.exists():
-            return None
+    def _start_watcher(self) -> bool:
+        """Следить за манифестами через watchdog (inotify / ReadDirectoryChangesW)"""
+        if Observer is None:
+            return False
+
+        self._observer = Observer()
+        self._observer.daemon = True
+        self._observer.schedule(_ManifestWatcher(self), str(self.releases_dir), recursive=True)
+        self._observer.start()
+        return True
+
+    def _schedule_refresh(self):
+        """Запланировать фоновое пересканирование"""
+        if not self.refresh_interval:
+            return
+
+        timer = threading.Timer(self.refresh_interval, self._refresh)
+        timer.daemon = True
+        timer.start()
+
+    def request_reload(self):
+        """Отложенная перезагрузка реестра (debounce событий watchdog)"""
+        with self._lock:
+            if self._reload_timer is not None:
+                self._reload_timer.cancel()
+            self._reload_timer = threading.Timer(RELOAD_DEBOUNCE, self._refresh_once)
+            self._reload_timer.daemon = True
+            self._reload_timer.start()
+
+    def _refresh_once(self):
+        """Обновить реестр (старый реестр остается при ошибке)"""
+        try:
+            self._reload()
+        except Exception:
+            app.logger.exception("Releases reload failed")
+
+    def _refresh(self):
+        """Фоновое обновление реестра по таймеру"""
+        try:
+            self._refresh_once()
+        finally:
+            self._schedule_refresh()
 
-        with open(manifest_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    def get_latest_release(self) -> dict:
+        """Получить последний релиз Terminal"""
+        with self._lock:
+            return self._latest
 
     def get_release(self, version: str) -> dict:
         """Получить конкретный релиз Terminal"""
-        # Ищем version.json в папке версии
-        manifest_file = self.releases_dir / version / "version.json"
-
-        if not manifest_file.exists():
-            return None
-
-        with open(manifest_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with self._lock:
+            return self._versions.get(version)
 
     def get_release_file(self, version: str) -> Path:
         """Получить файл Terminal.exe для версии"""
-        # Terminal.exe всегда в папке версии
-        terminal_file = self.releases_dir / version / "ManekiTerminal.exe"
+        # Terminal.exe всегда в папке версии; наличие версии - по реестру, без stat
+        with self._lock:
+            if version not in self._versions:
+                return None
 
-        if terminal_file.exists():
-            return terminal_file
-
-        return None
+        return self.releases_dir / version / "ManekiTerminal.exe"
 
     def get_latest_setup(self) -> Path:
         """Получить последний Setup файл"""
-        # Ищем все Setup файлы в корне releases/
-        setup_files = list(self.releases_dir.glob("ManekiTerminal-Setup-*.exe"))
-
-        if not setup_files:
-            return None
-
-        # Сортируем по версии (извлекаем версию из имени файла)
-        def extract_version(path: Path) -> tuple:
-            # ManekiTerminal-Setup-0.0.2.exe -> 0.0.2
-            name = path.stem  # ManekiTerminal-Setup-0.0.2
-            version_str = name.replace("ManekiTerminal-Setup-", "")  # 0.0.2
-            try:
-                return tuple(int(x) for x in version_str.split('.'))
-            except:
-                return (0, 0, 0)
+        # По реестру, как и get_setup_by_version: без stat / scandir на запрос
+        with self._lock:
+            name = self._latest_setup
 
-        # Сортируем и берем последний
-        setup_files.sort(key=extract_version, reverse=True)
-        return setup_files[0]
+        return self.releases_dir / name if name else None
 
     def get_setup_by_version(self, version: str) -> Path:
         """Получить Setup конкретной версии"""
-        setup_file = self.releases_dir / f"ManekiTerminal-Setup-{version}.exe"
-
-        if not setup_file.exists():
-            return None
+        name = f"{SETUP_PREFIX}{version}{SETUP_SUFFIX}"
 
-        return setup_file
+        with self._lock:
+            if name not in self._setup_sizes:
+                return None
 
-    def list_versions(self) -> list:
-        """Получить список всех доступных версий Terminal"""
-        versions = []
+        return self.releases_dir / name
 
-        # Найти все папки с версиями
-        for version_dir in self.releases_dir.iterdir():
-            if version_dir.is_dir():
-                version_json = version_dir / "version.json"
-                if version_json.exists():
-                    with open(version_json, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        versions.append(data)
+    def get_setup_size(self, setup_file: Path) -> int:
+        """Размер Setup файла по реестру (None если файла нет)"""
+        with self._lock:
+            return self._setup_sizes.get(setup_file.name)
 
-        # Сортировать по версии (новые сначала)
-        versions.sort(
-            key=lambda x: [int(p) for p in x["version"].split(".")],
-            reverse=True
-        )
+    def get_versions_json(self) -> bytes:
+        """Готовый JSON ответа /api/updates/versions"""
+        with self._lock:
+            return self._versions_json_bytes
 
-        return versions
+    def get_latest_json(self) -> bytes:
+        """Готовый JSON ответа /api/updates/latest (None если релизов нет)"""
+        with self._lock:
+            return self._latest_json_bytes
 
 
 release_manager = ReleaseManager(RELEASES_DIR)
 
 
+def _json_default(obj):
+    """Сериализация типов, которые orjson не знает"""
+    if isinstance(obj, Path):
+        return obj.as_posix()
+    raise TypeError
+
+
+def ojson(data, status=200):
+    """JSON-ответ через orjson (замена jsonify)"""
+    return raw_json(orjson.dumps(data, default=_json_default), status)
+
+
+def raw_json(body: bytes, status=200):
+    """JSON-ответ из уже сериализованных байтов"""
+    return app.response_class(body, status=status, mimetype="application/json")
+
+
+def _send_release_file(path: Path, download_name: str, etag: str = None,
+                       max_age: int = RELEASE_MAX_AGE):
+    """Отдать файл релиза: через nginx X-Accel-Redirect или send_file (dev)
+
+    Поддерживает условные запросы (If-None-Match / If-Modified-Since -> 304)
+    и докачку через Range. etag - SHA256 из version.json, если известен.
+    max_age=0 для URL без версии ("latest"): клиент перепроверяет по ETag.
+    Без stat на запрос: send_file делает его сам, Last-Modified при
+    X-Accel-Redirect выставляет nginx.
+    """
+    if not request.headers.get("X-Accelerated"):
+        try:
+            return send_file(
+                path,
+                as_attachment=True,
+                download_name=download_name,
+                conditional=True,
+                etag=etag or True,
+                max_age=max_age
+            )
+        except FileNotFoundError:
+            # Файл удален после сканирования реестра
+            abort(404, description=f"{download_name} not found")
+
+    relative = path.relative_to(RELEASES_DIR).as_posix()
+    resp = Response(mimetype="application/octet-stream")
+    resp.headers["X-Accel-Redirect"] = ACCEL_REDIRECT_PREFIX + relative
+    resp.headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+    if etag:
+        resp.set_etag(etag)
+    if max_age:
+        resp.cache_control.public = True
+    else:
+        resp.cache_control.no_cache = True
+    resp.cache_control.max_age = max_age
+    resp.make_conditional(request)
+
+    # На 304 nginx не должен отдавать файл
+    if resp.status_code == 304:
+        del resp.headers["X-Accel-Redirect"]
+    return resp
+
+
+@app.errorhandler(HTTPException)
+def handle_http_error(e: HTTPException):
+    """HTTP ошибки (abort(404, ...) и т.п.) в едином JSON формате"""
+    resp = ojson({
+        "success": False,
+        "error": e.description
+    }, e.code)
+
+    # Сохранить заголовки исключения (Allow для 405 и т.п.), кроме Content-Type
+    for name, value in e.get_headers():
+        if name.lower() != "content-type":
+            resp.headers[name] = value
+    return resp
+
+
+@app.errorhandler(Exception)
+def handle_error(e: Exception):
+    """Необработанные ошибки эндпоинтов"""
+    app.logger.exception(e)
+    return ojson({
+        "success": False,
+        "error": str(e)
+    }, 500)
+
+
 @app.route('/api/updates/latest', methods=['GET'])
 def get_latest():
     """Получить последнюю версию Terminal"""
-    try:
-        release = release_manager.get_latest_release()
+    body = release_manager.get_latest_json()
 
-        if not release:
-            return jsonify({
-                "success": False,
-                "error": "No releases available"
-            }), 404
+    if not body:
+        abort(404, description="No releases available")
 
-        return jsonify({
-            "success": True,
-            "data": release
-        })
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+    return raw_json(body)
 
 
 @app.route('/api/updates/check', methods=['GET'])
 def check_updates():
     """Проверить наличие обновлений Terminal"""
+    current_version = request.args.get('current', '0.0.0')
+
+    # Некорректная версия клиента -> 400 (версия сервера проверена в _scan)
     try:
-        current_version = request.args.get('current', '0.0.0')
+        _parse_version(current_version)
+    except ValueError:
+        abort(400, description=f"Invalid version: {current_version}")
 
-        latest = release_manager.get_latest_release()
+    latest = release_manager.get_latest_release()
 
-        if not latest:
-            return jsonify({
-                "success": False,
-                "error": "No releases available"
-            }), 404
+    if not latest:
+        abort(404, description="No releases available")
 
-        latest_version = latest['version']
+    latest_version = latest['version']
 
-        # Сравнить версии
-        update_available = _compare_versions(latest_version, current_version) > 0
+    # Сравнить версии
+    update_available = _compare_versions(latest_version, current_version) > 0
 
-        response_data = {
-            "success": True,
-            "data": {
-                "update_available": update_available,
-                "latest_version": latest_version,
-                "current_version": current_version,
-            }
+    response_data = {
+        "success": True,
+        "data": {
+            "update_available": update_available,
+            "latest_version": latest_version,
+            "current_version": current_version,
         }
+    }
+
+    # Если обновление доступно (или это первая установка)
+    if update_available or current_version == '0.0.0':
+        response_data["data"].update({
+            "version": latest_version,
+            "build": latest.get("build"),
+            "release_date": latest.get("release_date"),
+            "download_url": latest.get("download_url"),
+            "size": latest.get("size"),
+            "sha256": latest.get("sha256"),
+            "changelog": latest.get("changelog", []),
+            "required": latest.get("required", False)
+        })
 
-        # Если обновление доступно (или это первая установка)
-        if update_available or current_version == '0.0.0':
-            response_data["data"].update({
-                "version": latest_version,
-                "build": latest.get("build"),
-                "release_date": latest.get("release_date"),
-                "download_url": latest.get("download_url"),
-                "size": latest.get("size"),
-                "sha256": latest.get("sha256"),
-                "changelog": latest.get("changelog", []),
-                "required": latest.get("required", False)
-            })
-
-        return jsonify(response_data)
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+    return ojson(response_data)
 
 
 @app.route('/api/updates/download/<version>', methods=['GET'])
 def download_update(version: str):
     """Скачать Terminal.exe определенной версии"""
-    try:
-        terminal_file = release_manager.get_release_file(version)
-
-        if not terminal_file:
-            return jsonify({
-                "success": False,
-                "error": f"Terminal v{version} not found"
-            }), 404
-
-        return send_file(
-            terminal_file,
-            as_attachment=True,
-            download_name=f"ManekiTerminal-{version}.exe"
-        )
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+    terminal_file = release_manager.get_release_file(version)
+
+    if not terminal_file:
+        abort(404, description=f"Terminal v{version} not found")
+
+    release = release_manager.get_release(version) or {}
+
+    return _send_release_file(
+        terminal_file,
+        f"ManekiTerminal-{version}.exe",
+        etag=release.get("sha256")
+    )
 
 
 @app.route('/api/updates/changelog/<version>', methods=['GET'])
 def get_changelog(version: str):
     """Получить changelog конкретной версии"""
-    try:
-        release = release_manager.get_release(version)
+    release = release_manager.get_release(version)
 
-        if not release:
-            return jsonify({
-                "success": False,
-                "error": "Release not found"
-            }), 404
+    if not release:
+        abort(404, description="Release not found")
 
-        return jsonify({
-            "success": True,
-            "data": {
-                "version": version,
-                "changelog": release.get('changelog', []),
-                "release_date": release.get('release_date')
-            }
-        })
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+    return ojson({
+        "success": True,
+        "data": {
+            "version": version,
+            "changelog": release.get('changelog', []),
+            "release_date": release.get('release_date')
+        }
+    })
 
 
 @app.route('/api/updates/versions', methods=['GET'])
 def get_versions():
     """Получить список всех доступных версий Terminal"""
-    try:
-        versions = release_manager.list_versions()
-
-        return jsonify({
-            "success": True,
-            "data": {
-                "versions": versions,
-                "count": len(versions)
-            }
-        })
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+    return raw_json(release_manager.get_versions_json())
 
 
 # ==================== SETUP ENDPOINTS ====================
@@ -253,87 +515,52 @@ def get_versions():
 @app.route('/api/setup/latest', methods=['GET'])
 def get_latest_setup():
     """Получить информацию о последнем Setup"""
-    try:
-        setup_file = release_manager.get_latest_setup()
-
-        if not setup_file:
-            return jsonify({
-                "success": False,
-                "error": "No setup files available"
-            }), 404
-
-        # Извлечь версию из имени файла
-        # ManekiTerminal-Setup-0.0.2.exe -> 0.0.2
-        version = setup_file.stem.replace("ManekiTerminal-Setup-", "")
-
-        return jsonify({
-            "success": True,
-            "data": {
-                "version": version,
-                "filename": setup_file.name,
-                "size": setup_file.stat().st_size,
-                "download_url": f"/api/setup/download/latest"
-            }
-        })
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+    setup_file = release_manager.get_latest_setup()
+
+    if not setup_file:
+        abort(404, description="No setup files available")
+
+    # Извлечь версию из имени файла
+    # ManekiTerminal-Setup-0.0.2.exe -> 0.0.2
+    version = setup_file.stem.replace(SETUP_PREFIX, "")
+
+    return ojson({
+        "success": True,
+        "data": {
+            "version": version,
+            "filename": setup_file.name,
+            "size": release_manager.get_setup_size(setup_file),
+            "download_url": f"/api/setup/download/latest"
+        }
+    })
 
 
 @app.route('/api/setup/download/latest', methods=['GET'])
 def download_latest_setup():
     """Скачать последний Setup"""
-    try:
-        setup_file = release_manager.get_latest_setup()
-
-        if not setup_file:
-            return jsonify({
-                "success": False,
-                "error": "No setup files available"
-            }), 404
-
-        return send_file(
-            setup_file,
-            as_attachment=True,
-            download_name=setup_file.name
-        )
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+    setup_file = release_manager.get_latest_setup()
+
+    if not setup_file:
+        abort(404, description="No setup files available")
+
+    return _send_release_file(setup_file, setup_file.name, max_age=0)
 
 
 @app.route('/api/setup/download/<version>', methods=['GET'])
 def download_setup_by_version(version: str):
     """Скачать Setup конкретной версии"""
-    try:
-        setup_file = release_manager.get_setup_by_version(version)
-
-        if not setup_file:
-            return jsonify({
-                "success": False,
-                "error": f"Setup v{version} not found"
-            }), 404
-
-        return send_file(
-            setup_file,
-            as_attachment=True,
-            download_name=setup_file.name
-        )
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+    setup_file = release_manager.get_setup_by_version(version)
+
+    if not setup_file:
+        abort(404, description=f"Setup v{version} not found")
+
+    return _send_release_file(setup_file, setup_file.name)
 
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return ojson({
         "status": "healthy",
         "service": "ManekiTerminal Update Server",
         "version": "3.0",
@@ -341,23 +568,6 @@ def health_check():
     })
 
 
-def _compare_versions(v1: str, v2: str) -> int:
-    """Сравнить версии. Возвращает: 1 если v1 > v2, -1 если v1 < v2, 0 если равны"""
-    parts1 = [int(x) for x in v1.split('.')]
-    parts2 = [int(x) for x in v2.split('.')]
-
-    for i in range(max(len(parts1), len(parts2))):
-        p1 = parts1[i] if i < len(parts1) else 0
-        p2 = parts2[i] if i < len(parts2) else 0
-
-        if p1 > p2:
-            return 1
-        elif p1 < p2:
-            return -1
-
-    return 0
-
-
 if __name__ == '__main__':
     print("=" * 70)
     print("🚀 ManekiTerminal Update Server v3.0")
@@ -383,8 +593,8 @@ if __name__ == '__main__':
     # Проверить Setup
     setup = release_manager.get_latest_setup()
     if setup:
-        version = setup.stem.replace("ManekiTerminal-Setup-", "")
-        size_mb = setup.stat().st_size / (1024 * 1024)
+        version = setup.stem.replace(SETUP_PREFIX, "")
+        size_mb = release_manager.get_setup_size(setup) / (1024 * 1024)
         print(f"\n✓ Latest Setup: {setup.name}")
         print(f"  Version: {version}")
         print(f"  Size: {size_mb:.1f} MB")
@@ -409,4 +619,5 @@ if __name__ == '__main__':
     print("  GET  /health")
     print("\n")
 
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # Dev-сервер; в production: gunicorn / waitress (см. CLAUDE.md)
+    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file